@@ -6,15 +6,31 @@ when their lock-and-key features align. Designed for 3D printing.
 """
 
 import bpy
-import random
 import math
-from mathutils import Vector
+from mathutils import Matrix
 import os
+import sys
+import argparse
+import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 import datetime
-import traceback
+import functools
+import logging
+import logging.handlers
+from contextlib import contextmanager
 import bmesh
-from mathutils import noise
+import numpy as np
+
+# utils_numba.py sits next to this script; Blender does not put the script's
+# folder on sys.path by itself.
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in sys.path:
+    sys.path.append(_script_dir)
+try:
+    from utils_numba import make_perm, perlin3d
+except ImportError:  # numba is not bundled with Blender
+    perlin3d = None
 
 # ============================ USER SETTINGS ============================ #
 SPHERE_DIAMETER = 60.0      # mm outer diameter of the complete bead
@@ -24,9 +40,12 @@ CLEARANCE = 0.50            # mm radial clearance per side for sockets
 OVERLAP = 11# 0.25              # mm - How much peg/cutter overlaps with hemisphere
 BEAD_COUNT = 4              # how many bead pairs to make
 KEY_SHAPES = ["cylinder", "triangle", "square",'hexagon']
-KEYS_PER_BEAD = len(KEY_SHAPES)  # one of each shape per bead
 SEED = 2057               # RNG seed for reproducibility
 EXPORT_SUBFOLDER = "beads/" # Folder name for outputs relative to the .blend file
+PARALLEL_BEADS = None       # build each bead in its own headless Blender process.
+                            # None: only in background runs (blender -b), True/False: always/never.
+                            # Parallel runs write the STLs but leave no bead objects in this
+                            # scene, and the workers run the script as saved on disk
 
 OUTER_R = SPHERE_DIAMETER / 2.0
 INNER_R = OUTER_R - WALL_THICKNESS  # Usable depth for sockets within the solid base
@@ -41,24 +60,58 @@ noise_scale = 2.0  / OUTER_R   # frequency of the noise pattern
 # =======================
 
 # ============================ LOGGING SETUP ============================ #
-log_file = None
-
-def log_message(message):
-    """Writes a timestamped message to the log file and also prints to console as a fallback."""
-    global log_file
-    timestamp = datetime.datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    full_message = f"{timestamp} {message}"
-    if log_file and not log_file.closed:
-        try:
-            log_file.write(full_message + "\n")
-            log_file.flush()  # Ensure message is written immediately
-        except Exception as e:
-            # Fallback to printing if file writing fails
-            print(f"Error writing to log file: {e}")
-            print(full_message)
+LOG_FORMAT = "[%(asctime)s] %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+LOG_BUFFER = 1024           # records held in memory between flushes to the log file
+
+logger = logging.getLogger("protein_beads")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+log_message = logger.info
+
+
+def close_log():
+    """Flush and detach every log handler, closing the log file if there is one."""
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        target = getattr(handler, "target", None)
+        handler.close()  # MemoryHandler flushes to its target here
+        if target is not None:
+            target.close()
+
+
+WORKER_LOG_TAG = "@protein_beads@ "  # marks worker log lines in Blender's stdout
+
+
+class WorkerLogFormatter(logging.Formatter):
+    """Tag every line of a message so the parent can pick it out of Blender's output."""
+
+    def format(self, record):
+        return "\n".join(WORKER_LOG_TAG + line for line in record.getMessage().split("\n"))
+
+
+def setup_log(log_filepath=None, formatter=None):
+    """Send log messages to a buffered log file, or to the console if no path is given."""
+    close_log()  # drop handlers left over from an earlier run in this Blender session
+    formatter = formatter or logging.Formatter(LOG_FORMAT, LOG_DATEFMT)
+    if log_filepath:
+        file_handler = logging.FileHandler(log_filepath, mode="w")
+        file_handler.setFormatter(formatter)
+        handler = logging.handlers.MemoryHandler(LOG_BUFFER, flushLevel=logging.ERROR,
+                                                 target=file_handler)
     else:
-        # Fallback to printing if log file is not set up or is closed
-        print(full_message)
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+
+def flush_log():
+    """Write out any buffered log messages."""
+    for handler in logger.handlers:
+        handler.flush()
+
+
+setup_log()
 
 # ========================= GEOMETRY HELPERS =========================== #
 
@@ -66,100 +119,207 @@ def wipe_scene():
     """Clears all objects from the scene."""
     if bpy.context.object and bpy.context.object.mode != 'OBJECT':
         bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete()
+    for obj in list(bpy.context.scene.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+
 
+@contextmanager
+def undo_disabled():
+    """Turn off global undo for the duration of the block; nothing here needs to be undoable."""
+    edit_prefs = bpy.context.preferences.edit
+    prev_undo = edit_prefs.use_global_undo
+    edit_prefs.use_global_undo = False
+    try:
+        yield
+    finally:
+        edit_prefs.use_global_undo = prev_undo
 
 
 # 
 # protein‑surface noisey sphere --------------------------------------------------
 
-def make_noisy_sphere():
-    # Create a UV sphere
-    bpy.ops.mesh.primitive_uv_sphere_add(
-        segments=segments,
-        ring_count=ring_count,
-        radius=OUTER_R,
-        enter_editmode=False
-    )
+# Lattice Perlin comes from the JIT kernel when numba is available. Otherwise
+# fall back to a sinusoidal pseudo-Perlin:
+#     n(p) = sum_j a_j * sin(2*pi * p . k_j + b_j)
+# The wave vectors, phases and amplitudes are drawn from the seed so every
+# sphere gets the same surface.
+NOISE_WAVES = 4
+NOISE_BACKEND = ("lattice Perlin (numba)" if perlin3d is not None
+                 else "sinusoidal pseudo-Perlin (NumPy, numba not available)")
 
-    obj = bpy.context.active_object
-    mesh = obj.data
 
-    # Switch to BMesh for safe mesh editing
-    bm = bmesh.new()
-    bm.from_mesh(mesh)
+@functools.lru_cache(maxsize=8)
+def pseudo_perlin_waves(seed):
+    """Wave vectors, phases and amplitudes of the sinusoidal noise for a seed."""
+    rng = np.random.default_rng(seed)
+    k = rng.normal(scale=0.5, size=(3, NOISE_WAVES)).astype(np.float32)
+    b = rng.uniform(0, 2 * np.pi, NOISE_WAVES).astype(np.float32)
+    a = 0.5 ** np.arange(NOISE_WAVES, dtype=np.float32)
+    a /= a.sum()  # keep the sum within [-1, 1] like noise.noise()
+    return k, b, a
 
-    # Displace each vertex along its normal by a Perlin noise value
-    for v in bm.verts:
-        # Sample 3D Perlin noise at the vertex coordinate (scaled)
-        n = noise.noise(v.co * noise_scale)
-        # Move vertex along its own normal
-        v.co += v.co.normalized() * n * noise_strength
 
-    # Write the BMesh back to the mesh and free
-    bm.to_mesh(mesh)
-    bm.free()
+def pseudo_perlin(pts, seed):
+    """Evaluate the sinusoidal noise for an (N, 3) array of sample points."""
+    k, b, a = pseudo_perlin_waves(seed)
+    return np.sin(2 * np.pi * (pts @ k) + b) @ a
 
-    # Smooth shading
-    bpy.ops.object.shade_smooth()
 
-    return obj
+def sample_noise(pts, seed):
+    """Noise value for each row of an (N, 3) float32 array of sample points."""
+    if perlin3d is not None:
+        return perlin3d(np.ascontiguousarray(pts, dtype=np.float32), make_perm(seed))
+    return pseudo_perlin(pts, seed)
+
+
+_noise_displacements = {}
+
+
+def noise_displacements(co, scale, strength, seed):
+    """Flat float32 array of radial noise offsets for the (N, 3) sphere coordinates co.
+
+    Memoised on the sphere and noise parameters, plus the vertex count. A
+    later call with the same key gets the first result, so every caller
+    must pass the same UV-sphere topology (make_solid_hemisphere does).
+    """
+    key = (segments, ring_count, OUTER_R, len(co), scale, strength, seed)
+    if key not in _noise_displacements:
+        # Radial offset by the noise value at each (scaled) vertex position
+        n_hat = co / np.linalg.norm(co, axis=1, keepdims=True)
+        n = sample_noise(co * scale, seed)
+        disp = (n_hat * (n * strength)[:, None]).astype(np.float32).ravel()
+        disp.setflags(write=False)  # shared by every caller
+        _noise_displacements[key] = disp
+    return _noise_displacements[key]
+
+
+def add_surface_noise(mesh):
+    """Displace the vertices of a sphere mesh radially by the surface noise."""
+    # Pull all vertex coordinates in one call instead of walking a BMesh
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co += noise_displacements(co.reshape(-1, 3), noise_scale, noise_strength, SEED)
+    mesh.vertices.foreach_set("co", co)
+    mesh.update()
 
 
 def make_solid_hemisphere(is_top: bool):
     """Return a solid hemisphere mesh object."""
-    # Create a sphere
-     # Add noise BEFORE bisecting if enabled
+    name = "Hemisphere_Top" if is_top else "Hemisphere_Bot"
+    mesh = bpy.data.meshes.new(name)
+
+    # One BMesh carries the sphere through noise, bisect and capping
+    bm = bmesh.new()
+    bmesh.ops.create_uvsphere(bm, u_segments=segments, v_segments=ring_count,
+                              radius=OUTER_R)
+
+    # Add noise BEFORE bisecting if enabled
     if ADD_SURFACE_NOISE:
         log_message("  Adding surface noise...")
-        hemisphere = make_noisy_sphere()
+        # Round-trip through the mesh so the noise can use foreach_get/foreach_set
+        bm.to_mesh(mesh)
+        add_surface_noise(mesh)
+        bm.clear()
+        bm.from_mesh(mesh)
         log_message("  Surface noise applied.") 
 
-    else:    
-        # Create a sphere
-        bpy.ops.mesh.primitive_uv_sphere_add(radius=OUTER_R, segments=64, ring_count=32)
-        hemisphere = bpy.context.active_object
-        hemisphere.name = "Hemisphere_Top" if is_top else "Hemisphere_Bot"
-
+    # Smooth shading on the curved surface; the cap added below stays flat
+    for f in bm.faces:
+        f.smooth = True
 
-    # Cut the sphere into a solid hemisphere at Z=0
-    bpy.ops.object.mode_set(mode='EDIT')
+    # Cut the sphere into a solid hemisphere at Z=0, keeping the relevant half
     plane_no = (0, 0, 1) if is_top else (0, 0, -1)
-    bpy.ops.mesh.select_all(action='SELECT')
-    # Bisect the mesh at the Z=0 plane, keeping the relevant half and filling the cut face
-    bpy.ops.mesh.bisect(plane_co=(0, 0, 0), plane_no=plane_no,
-                        clear_inner=True, clear_outer=False, use_fill=True)
-    bpy.ops.object.mode_set(mode='OBJECT')
-    
-    # Apply any scales to ensure boolean operations work correctly
-    bpy.ops.object.transform_apply(location=False, rotation=False, scale=True)
+    bmesh.ops.bisect_plane(bm, geom=bm.verts[:] + bm.edges[:] + bm.faces[:], dist=1e-6,
+                           plane_co=(0, 0, 0), plane_no=plane_no,
+                           clear_inner=True, clear_outer=False)
+    # Fill the cut face
+    bmesh.ops.holes_fill(bm, edges=[e for e in bm.edges if e.is_boundary])
+
+    bm.to_mesh(mesh)
+    bm.free()
+
+    hemisphere = bpy.data.objects.new(name, mesh)
+    bpy.context.collection.objects.link(hemisphere)
     return hemisphere
 
+
+_base_meshes = {}
+_base_edge_r = None  # rim radius of the base hemispheres, see base_edge_radius()
+
+
+def base_hemisphere_mesh(is_top: bool):
+    """Return the shared solid hemisphere mesh, building it on first use."""
+    if is_top not in _base_meshes:
+        hemisphere = make_solid_hemisphere(is_top)
+        _base_meshes[is_top] = hemisphere.data
+        bpy.data.objects.remove(hemisphere, do_unlink=True)
+    return _base_meshes[is_top]
+
+
+def base_edge_radius():
+    """Smallest distance from the Z axis to the rim of the base hemispheres' flat face.
+
+    Surface noise pulls the rim in by up to noise_strength, so this is the
+    radius keys have to stay inside, not OUTER_R. Computed once per process.
+    """
+    global _base_edge_r
+    if _base_edge_r is not None:
+        return _base_edge_r
+    edge_r = OUTER_R
+    for is_top in (True, False):
+        mesh = base_hemisphere_mesh(is_top)
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        co = co.reshape(-1, 3)
+        rim = co[np.abs(co[:, 2]) < 1e-4]
+        if len(rim):
+            edge_r = min(edge_r, float(np.hypot(rim[:, 0], rim[:, 1]).min()))
+    _base_edge_r = edge_r
+    return edge_r
+
+
+def free_base_meshes():
+    """Release the shared hemisphere meshes once all beads are built."""
+    global _base_edge_r
+    for mesh in _base_meshes.values():
+        bpy.data.meshes.remove(mesh)
+    _base_meshes.clear()
+    _base_edge_r = None
+
+
+def hemisphere_from_mesh(base_mesh, name):
+    """Return a new hemisphere object owning a private copy of base_mesh."""
+    mesh = base_mesh.copy()
+    mesh.name = name
+    obj = bpy.data.objects.new(name, mesh)
+    bpy.context.collection.objects.link(obj)
+    return obj
+
 # ---------- primitive factories ---------- #
-# These functions create basic shapes centered at their origin (0,0,0)
+# These functions add basic shapes into an existing BMesh. Each shape is
+# centred at the origin and then moved into place by `matrix`.
 
-def cylinder(radius, height):
-    bpy.ops.mesh.primitive_cylinder_add(radius=radius, depth=height)
-    return bpy.context.active_object
+def _prism(bm, radius, height, matrix, vertices):
+    bmesh.ops.create_cone(bm, cap_ends=True, segments=vertices,
+                          radius1=radius, radius2=radius, depth=height, matrix=matrix)
 
 
-def triangular_prism(radius, height):
-    bpy.ops.mesh.primitive_cone_add(radius1=radius, radius2=radius, depth=height, vertices=3)
-    return bpy.context.active_object
+def cylinder(bm, radius, height, matrix):
+    _prism(bm, radius, height, matrix, 32)
 
 
-def square_prism(radius, height):
-    bpy.ops.mesh.primitive_cube_add(size=radius * 2)
-    obj = bpy.context.active_object
-    obj.scale.z = height / (radius * 2)
-    bpy.ops.object.transform_apply(scale=True)
-    return obj
+def triangular_prism(bm, radius, height, matrix):
+    _prism(bm, radius, height, matrix, 3)
+
 
+def square_prism(bm, radius, height, matrix):
+    # Bake the footprint and height straight into the vertices
+    scale = Matrix.Diagonal((radius * 2, radius * 2, height, 1.0))
+    bmesh.ops.create_cube(bm, size=1.0, matrix=matrix @ scale)
 
-def hexagon(radius, height):
-    bpy.ops.mesh.primitive_cylinder_add(radius=radius, depth=height, vertices=6)
-    return bpy.context.active_object
+
+def hexagon(bm, radius, height, matrix):
+    _prism(bm, radius, height, matrix, 6)
 
 SHAPE_FACTORIES = {
     "cylinder": cylinder,
@@ -168,114 +328,320 @@ SHAPE_FACTORIES = {
     "hexagon": hexagon
 }
 
+# Vertex and face arrays for each (shape, radius, height), built once and
+# reused for every bead: (co, loop_vertices, loop_start, loop_total)
+PRIMITIVE_ARRAYS = {}
+
+
+def primitive_arrays(shape, radius, height):
+    """Return the cached NumPy geometry of a key primitive centred at the origin."""
+    key = (shape, radius, height)
+    if key not in PRIMITIVE_ARRAYS:
+        bm = bmesh.new()
+        SHAPE_FACTORIES[shape](bm, radius, height, Matrix.Identity(4))
+        mesh = bpy.data.meshes.new("PrimitiveScratch")
+        bm.to_mesh(mesh)
+        bm.free()
+
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_vertices)
+        loop_start = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_start)
+        loop_total = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_total)
+        bpy.data.meshes.remove(mesh)
+
+        PRIMITIVE_ARRAYS[key] = (co.reshape(-1, 3), loop_vertices, loop_start, loop_total)
+    return PRIMITIVE_ARRAYS[key]
+
+
+def fill_mesh_from_arrays(mesh, co, loop_vertices, loop_start, loop_total):
+    """Replace the geometry of mesh with flat vertex/loop/polygon arrays."""
+    mesh.clear_geometry()
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.loops.add(len(loop_vertices))
+    mesh.loops.foreach_set("vertex_index", loop_vertices)
+    mesh.polygons.add(len(loop_start))
+    mesh.polygons.foreach_set("loop_start", loop_start)
+    try:
+        mesh.polygons.foreach_set("loop_total", loop_total)
+    except (AttributeError, TypeError):
+        pass  # read-only (derived from loop_start) in newer Blender versions
+    mesh.update(calc_edges=True)
+
+
+# Boolean tool objects, one per name ("AllPegs"/"AllCutters"). Each keeps a
+# single mesh datablock whose geometry is swapped for every hemisphere.
+TOOL_OBJECTS = {}
+
+
+def key_tool(name):
+    """Return the persistent tool object called name, creating it on first use."""
+    tool = TOOL_OBJECTS.get(name)
+    try:
+        if tool is not None and tool.name:
+            return tool
+    except ReferenceError:
+        pass  # removed from the file since it was cached, e.g. by wipe_scene()
+    tool = bpy.data.objects.new(name, bpy.data.meshes.new(name))
+    bpy.context.collection.objects.link(tool)
+    TOOL_OBJECTS[name] = tool
+    return tool
+
+
+def free_tool_objects():
+    """Remove the persistent tool objects and their meshes."""
+    for tool in TOOL_OBJECTS.values():
+        try:
+            mesh = tool.data
+            bpy.data.objects.remove(tool, do_unlink=True)
+            bpy.data.meshes.remove(mesh)
+        except ReferenceError:
+            pass
+    TOOL_OBJECTS.clear()
+
 # ---------- key placement ---------- #
 
-def random_key_positions(n):
-    """Generate n random (x, y) coordinates within the base area, avoiding overlaps."""
-    coords = []
-    attempts = 0
-    usable_radius_for_keys = INNER_R - MAX_KEY_RADIUS  # Ensure key fits within the flat base
-    while len(coords) < n and attempts < 1000:
-        r = random.uniform(0, usable_radius_for_keys)
-        ang = random.uniform(0, 2 * math.pi)
-        x, y = r * math.cos(ang), r * math.sin(ang)
-        if all(math.hypot(x - cx, y - cy) > MAX_KEY_RADIUS * 2 for cx, cy in coords):
-            coords.append((x, y))
-        attempts += 1
-    return coords
+KEY_CANDIDATE_BATCH = 256   # candidate positions drawn per NumPy batch
+KEY_MAX_BATCHES = 8         # batches tried per key before giving up on it
+
+# Circumscribed radius of each shape as a multiple of its key radius
+SHAPE_EXTENT = {
+    "cylinder": 1.0,
+    "triangle": 1.0,
+    "square": math.sqrt(2),  # corners of the square prism
+    "hexagon": 1.0
+}
+
+
+def key_footprint(shape):
+    """Radius of the circle enclosing the shape's socket cutter (wider than its peg)."""
+    return (MAX_KEY_RADIUS + CLEARANCE) * SHAPE_EXTENT[shape]
+
+
+def random_key_positions(shapes, rng, edge_r):
+    """Place one key of each shape at random (x, y) within the base area, avoiding overlaps.
+
+    edge_r is the rim radius of the hemispheres' flat face (base_edge_radius()).
+
+    All keys of a hemisphere are cut with a single boolean, which cannot cope
+    with overlapping tools, so keys are spaced by the sum of their footprints.
+    Returns (shape, (x, y)) pairs; a shape that cannot be placed is left out.
+    """
+    specs = []
+    placed = np.empty((0, 2))
+    placed_r = np.empty(0)
+    for shape in shapes:
+        footprint = key_footprint(shape)
+        # Ensure the socket fits within the flat base, inside the noisy rim
+        usable_radius_for_keys = min(INNER_R, edge_r) - footprint
+        for _ in range(KEY_MAX_BATCHES):
+            # sqrt of a uniform radius gives an area-uniform spread over the disk
+            r = np.sqrt(rng.random(KEY_CANDIDATE_BATCH)) * usable_radius_for_keys
+            ang = rng.random(KEY_CANDIDATE_BATCH) * 2 * math.pi
+            cand = np.stack([r * np.cos(ang), r * np.sin(ang)], axis=1)
+            if len(placed):
+                d = np.linalg.norm(cand[:, None] - placed[None], axis=2)
+                cand = cand[(d > footprint + placed_r).all(axis=1)]
+            if len(cand):
+                x, y = cand[0]
+                placed = np.vstack([placed, cand[:1]])
+                placed_r = np.append(placed_r, footprint)
+                specs.append((shape, (float(x), float(y))))
+                break
+        else:
+            logger.warning(f"  Could not place a {shape} key without overlapping the others")
+    return specs
 
 # ---------- boolean helper ---------- #
 
-def boolean(target, tool, op_type):
-    """Apply a boolean modifier (DIFFERENCE, UNION, INTERSECT) to target using tool."""
+NON_MANIFOLD_THRESHOLD = 0   # open/non-manifold edges tolerated before retrying with EXACT
+
+
+def count_non_manifold_edges(mesh):
+    """Number of edges that do not join exactly two faces."""
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    count = sum(1 for e in bm.edges if len(e.link_faces) != 2)
+    bm.free()
+    return count
+
+
+def _apply_boolean(target, tool, op_type, solver):
     mod = target.modifiers.new(name="Bool", type='BOOLEAN')
     mod.object = tool
     mod.operation = op_type
-    mod.solver = 'FAST'  # FAST is more tolerant than EXACT for this workflow
+    mod.solver = solver
     bpy.context.view_layer.objects.active = target
-    
+
     if bpy.context.object and bpy.context.object.mode != 'OBJECT':
         bpy.ops.object.mode_set(mode='OBJECT')
-    
-    log_message(f"    Applying boolean '{op_type}' on {target.name} with {tool.name}")
+
+    log_message(f"    Applying boolean '{op_type}' ({solver}) on {target.name} with {tool.name}")
+    flush_log()  # a crash inside the solver should not take the buffered log with it
     try:
         bpy.ops.object.modifier_apply(modifier=mod.name)
         log_message(f"    Boolean applied successfully.")
+        return True
     except RuntimeError as e:
-        log_message(f"    Error applying boolean modifier: {e}")
+        logger.error(f"    Error applying boolean modifier: {e}")
+        target.modifiers.remove(mod)
+        return False
+
+
+def boolean(target, tool, op_type):
+    """Apply a boolean modifier (DIFFERENCE, UNION, INTERSECT) to target using tool.
+
+    FAST is tried first; if it leaves the mesh non-manifold the original mesh is
+    restored and the boolean is redone with EXACT. Returns True if the result is
+    watertight.
+    """
+    backup = target.data.copy()
+    if _apply_boolean(target, tool, op_type, 'FAST'):
+        non_manifold = count_non_manifold_edges(target.data)
+        if non_manifold <= NON_MANIFOLD_THRESHOLD:
+            bpy.data.meshes.remove(backup)
+            return True
+        log_message(f"    FAST result has {non_manifold} non-manifold edges, retrying with EXACT")
+
+    # Put the pre-boolean mesh back and redo the operation with the exact solver
+    failed = target.data
+    name = failed.name
+    target.data = backup
+    bpy.data.meshes.remove(failed)
+    backup.name = name
+    if not _apply_boolean(target, tool, op_type, 'EXACT'):
+        return False
+    return count_non_manifold_edges(target.data) <= NON_MANIFOLD_THRESHOLD
 
 
 def add_keys(hemisphere, key_specs, is_top):
-    """Add pegs (if is_top, UNION) or sockets (if not is_top, DIFFERENCE) to the solid hemisphere."""
+    """Add pegs (if is_top, UNION) or sockets (if not is_top, DIFFERENCE) to the solid hemisphere.
+
+    Returns the (shape, (x, y)) specs that were actually added.
+    """
     # Make sure we're in object mode
     if bpy.context.object and bpy.context.object.mode != 'OBJECT':
         bpy.ops.object.mode_set(mode='OBJECT')
     
+    if is_top:
+        # Pegs for the top hemisphere (UNION operation)
+        radius = MAX_KEY_RADIUS
+        height = PEG_LENGTH
+        # Position for UNION: Peg should overlap with the hemisphere base
+        # Place it so a portion of its top extends ABOVE z=0 by OVERLAP amount
+        key_z = -(height/2 - OVERLAP)
+    else:
+        # Socket cutters for the bottom hemisphere (DIFFERENCE operation)
+        radius = MAX_KEY_RADIUS + CLEARANCE
+        height = PEG_LENGTH + CLEARANCE
+        # Position for DIFFERENCE: Cutter should overlap with the hemisphere base
+        # Place it so a portion of its top extends BELOW z=0 by OVERLAP amount
+        key_z = (height/2 - OVERLAP)
+
+    # Drop keys whose footprint is not entirely inside the hemisphere base;
+    # the same test runs for pegs and sockets so the halves stay matched
+    edge_r = base_edge_radius()
+    kept = []
     for i, (shape, (x, y)) in enumerate(key_specs, 1):
-        factory = SHAPE_FACTORIES[shape]
-        log_message(f"  Key {i}: {shape} @ ({x:.1f}, {y:.1f})")
-        
-        if is_top:
-            # Create pegs for the top hemisphere (UNION operation)
-            radius = MAX_KEY_RADIUS
-            height = PEG_LENGTH
-            key = factory(radius, height)
-            key.name = f"Peg_{shape}_{i}"
-            
-            # Position for UNION: Peg should overlap with the hemisphere base
-            # Place it so a portion of its top extends ABOVE z=0 by OVERLAP amount
-            key_z = -(height/2 - OVERLAP)
-            key.location = (x, y, key_z)
-            
-            boolean(hemisphere, key, 'UNION')
+        if math.hypot(x, y) + key_footprint(shape) < edge_r:
+            kept.append((i, shape, (x, y)))
         else:
-            # Create sockets for the bottom hemisphere (DIFFERENCE operation)
-            radius = MAX_KEY_RADIUS + CLEARANCE
-            height = PEG_LENGTH + CLEARANCE
-            key = factory(radius, height)
-            key.name = f"SocketCutter_{shape}_{i}"
-            
-            # Position for DIFFERENCE: Cutter should overlap with the hemisphere base
-            # Place it so a portion of its top extends BELOW z=0 by OVERLAP amount
-            key_z = (height/2 - OVERLAP)
-            key.location = (x, y, key_z)
-            
-            boolean(hemisphere, key, 'DIFFERENCE')
-        
-        # Clean up key objects after boolean operations
-        bpy.data.objects.remove(key, do_unlink=True)
-
-    # Clean up the mesh after booleans
+            log_message(f"  Key {i}: {shape} @ ({x:.1f}, {y:.1f}) skipped, outside the base")
+    added = [(shape, xy) for _, shape, xy in kept]
+
+    # Stack the cached primitive arrays for every key, translated into place,
+    # into one tool mesh so the boolean runs once per hemisphere
+    blocks = [primitive_arrays(shape, radius, height) for _, shape, _ in kept]
+    all_co = np.empty((sum(len(b[0]) for b in blocks), 3), dtype=np.float32)
+    all_loops = np.empty(sum(len(b[1]) for b in blocks), dtype=np.int32)
+    all_start = np.empty(sum(len(b[2]) for b in blocks), dtype=np.int32)
+    all_total = np.empty_like(all_start)
+    v_off = l_off = p_off = 0
+    for (i, shape, (x, y)), (co, loops, start, total) in zip(kept, blocks):
+        log_message(f"  Key {i}: {shape} @ ({x:.1f}, {y:.1f})")
+        all_co[v_off:v_off + len(co)] = co + (x, y, key_z)
+        all_loops[l_off:l_off + len(loops)] = loops + v_off
+        all_start[p_off:p_off + len(start)] = start + l_off
+        all_total[p_off:p_off + len(total)] = total
+        v_off += len(co)
+        l_off += len(loops)
+        p_off += len(start)
+
+    watertight = False
+    if kept:
+        # Reuse the same tool object and mesh; only the geometry is replaced
+        tool = key_tool("AllPegs" if is_top else "AllCutters")
+        fill_mesh_from_arrays(tool.data, all_co, all_loops, all_start, all_total)
+        watertight = boolean(hemisphere, tool, 'UNION' if is_top else 'DIFFERENCE')
+
+    # A watertight boolean result needs no repair
+    if watertight:
+        log_message("  Boolean result is watertight, skipping mesh cleanup.")
+        return added
+
+    # Clean up the mesh after booleans, in object mode through BMesh
     log_message("  Performing mesh cleanup...")
-    bpy.context.view_layer.objects.active = hemisphere
-    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
-        bpy.ops.object.mode_set(mode='OBJECT')
-    
+    bm = bmesh.new()
     try:
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.remove_doubles()
-        bpy.ops.mesh.normals_make_consistent(inside=False)
-        bpy.ops.object.mode_set(mode='OBJECT')
+        bm.from_mesh(hemisphere.data)
+        bmesh.ops.remove_doubles(bm, verts=bm.verts, dist=1e-5)
+        bmesh.ops.recalc_face_normals(bm, faces=bm.faces)
+        bm.to_mesh(hemisphere.data)
+        hemisphere.data.update()
         log_message("  Mesh cleanup successful.")
-    except RuntimeError as e:
-        log_message(f"  Error during mesh cleanup: {e}")
+    except (RuntimeError, ValueError) as e:
+        logger.error(f"  Error during mesh cleanup: {e}")
+    finally:
+        bm.free()
+    return added
 
 
 # ---------- export ---------- #
 
+# Binary STL triangle record: normal, three vertices, attribute byte count
+STL_RECORD = np.dtype([("n", "<f4", (3,)), ("v", "<f4", (3, 3)), ("a", "<u2")])
+
+
+def write_binary_stl(obj, path):
+    """Write obj's mesh (in world space) to path as a binary STL."""
+    mesh = obj.data
+    mesh.calc_loop_triangles()
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", tris)
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3)
+
+    mat = np.array(obj.matrix_world, dtype=np.float32)
+    co = co @ mat[:3, :3].T + mat[:3, 3]
+
+    v = co[tris.reshape(-1, 3)]
+    n = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    length = np.linalg.norm(n, axis=1, keepdims=True)
+    np.divide(n, length, out=n, where=length > 0)  # leave degenerate faces at zero
+
+    records = np.zeros(len(v), dtype=STL_RECORD)
+    records["n"] = n
+    records["v"] = v
+    with open(path, "wb") as f:
+        f.write(b"\0" * 80)
+        f.write(np.uint32(len(records)).tobytes())
+        f.write(records.tobytes())
+
+
 def export_stl(obj, folder, name):
     """Export an object as an STL file."""
-    if bpy.context.object and bpy.context.object.mode != 'OBJECT':
-        bpy.ops.object.mode_set(mode='OBJECT')
     path = os.path.join(folder, name)
-    bpy.ops.object.select_all(action='DESELECT')
-    obj.select_set(True)
     log_message(f"Exporting {obj.name} to {path}")
     try:
-        bpy.ops.export_mesh.stl(filepath=path, use_selection=True)
+        write_binary_stl(obj, path)
         log_message("Exported successfully.")
-    except RuntimeError as e:
-        log_message(f"Error exporting {obj.name}: {e}")
+    except OSError as e:
+        logger.error(f"Error exporting {obj.name}: {e}")
 
 
 # ---------- Output Directory Helper ---------- #
@@ -307,10 +673,102 @@ def get_output_dir():
 
 # ============================== MAIN =============================== #
 
+def make_one_bead(idx, seed, out_dir):
+    """Build, export and log one bead pair. Safe to run in a fresh Blender process."""
+    rng = np.random.default_rng(seed)
+    specs = random_key_positions(KEY_SHAPES, rng, base_edge_radius())
+
+    log_message(f"\n--- Generating Bead {idx} - Top Half (with pegs) ---")
+    top = hemisphere_from_mesh(base_hemisphere_mesh(True), f"Top_{idx}")
+    # Both halves apply the same cull, so the top's keys describe the pair
+    added = add_keys(top, specs, True)
+
+    log_message(f"\n--- Generating Bead {idx} - Bottom Half (with sockets) ---")
+    bottom = hemisphere_from_mesh(base_hemisphere_mesh(False), f"Bottom_{idx}")
+    add_keys(bottom, specs, False)
+
+    # One explicit depsgraph update per bead, after all edits
+    bpy.context.view_layer.update()
+
+    log_message(f"\n--- Exporting Bead {idx} Halves ---")
+    export_stl(top, out_dir, f"bead_{idx}_top.stl")
+    export_stl(bottom, out_dir, f"bead_{idx}_bottom.stl")
+
+    log_message(f"\nBead {idx} layout:")
+    for s, (x, y) in added:
+        log_message(f"  {s:8s}  (x={x:.1f}, y={y:.1f}) mm")
+    log_message("-" * 40)
+    flush_log()
+
+
+def script_has_unsaved_edits():
+    """True if this script is open in the Text Editor with changes not yet saved."""
+    script_path = os.path.abspath(__file__)
+    for text in bpy.data.texts:
+        if (text.is_dirty and text.filepath
+                and os.path.abspath(bpy.path.abspath(text.filepath)) == script_path):
+            return True
+    return False
+
+
+def can_run_workers():
+    """True if beads can be farmed out to headless Blender processes."""
+    parallel = bpy.app.background if PARALLEL_BEADS is None else PARALLEL_BEADS
+    if not (parallel and BEAD_COUNT > 1
+            and bpy.app.binary_path and os.path.isfile(__file__)):
+        return False
+    if script_has_unsaved_edits():
+        # Workers load the file from disk and would silently run the old code
+        logger.warning("Script has unsaved edits in the Text Editor; building beads serially")
+        return False
+    return True
+
+
+def run_bead_worker(idx, out_dir):
+    """Run make_one_bead for one bead in a background Blender and return the result."""
+    cmd = [bpy.app.binary_path, "--background", "--factory-startup",
+           "--python-exit-code", "1", "--python", os.path.abspath(__file__),
+           "--", "--bead", str(idx), "--seed", str(SEED + idx), "--out", out_dir]
+    return subprocess.run(cmd, capture_output=True, text=True)
+
+
+def generate_beads_parallel(out_dir):
+    """Build the beads concurrently, one headless Blender per bead."""
+    workers = min(BEAD_COUNT, os.cpu_count() or 1)
+    log_message(f"Building {BEAD_COUNT} beads with {workers} worker processes")
+    # Threads only wait on the child processes; the work happens in Blender
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda idx: run_bead_worker(idx, out_dir), range(1, BEAD_COUNT + 1))
+        for idx, result in enumerate(results, 1):
+            # Fold the worker's own log lines into this log, leaving out
+            # Blender's start-up and shutdown chatter
+            for line in result.stdout.splitlines():
+                message = line[len(WORKER_LOG_TAG):]
+                if line.startswith(WORKER_LOG_TAG) and message.strip():
+                    log_message(f"[bead {idx}] {message}")
+            if result.returncode != 0:
+                logger.error(f"Bead {idx} worker failed with exit code {result.returncode}:\n"
+                             f"{result.stderr}")
+            flush_log()
+
+
+def run_worker():
+    """Entry point for a headless worker started by generate_beads_parallel."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bead", type=int, required=True)
+    parser.add_argument("--seed", type=int, required=True)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args(sys.argv[sys.argv.index("--") + 1:])
+
+    # Untimestamped, tagged lines on stdout; the parent adds its own timestamps
+    setup_log(formatter=WorkerLogFormatter())
+    with undo_disabled():
+        wipe_scene()
+        make_one_bead(args.bead, args.seed, args.out)
+
+
 def generate_beads():
     """Generate the bead pairs with lock-and-key features."""
-    global log_file
-
     # Determine the base directory for logs and exports
     base_output_dir = get_output_dir()
 
@@ -323,57 +781,52 @@ def generate_beads():
     log_filepath = os.path.join(base_output_dir, log_filename)
 
     try:
-        log_file = open(log_filepath, "w")
+        setup_log(log_filepath)
         log_message("--- Protein-bead generator script started ---")
         log_message(f"Log file created at: {log_filepath}")
-    except Exception as e:
+    except OSError as e:
         print(f"CRITICAL ERROR: Could not open log file {log_filepath}: {e}. Messages will print to console.")
-        log_file = None
+        setup_log()
+        log_filepath = None
+
+    # The same SEED gives a different surface with each backend
+    log_message(f"Surface noise: {NOISE_BACKEND if ADD_SURFACE_NOISE else 'off'}, seed {SEED}")
 
     # Script execution logic
     try:
-        random.seed(SEED)
         if bpy.context.object and bpy.context.object.mode != 'OBJECT':
             bpy.ops.object.mode_set(mode='OBJECT')
-        wipe_scene()
-
-        for idx in range(1, BEAD_COUNT + 1):
-            specs = list(zip(KEY_SHAPES, random_key_positions(KEYS_PER_BEAD)))
-
-            log_message(f"\n--- Generating Bead {idx} - Top Half (with pegs) ---")
-            top = make_solid_hemisphere(True)
-            add_keys(top, specs, True)
-
-            log_message(f"\n--- Generating Bead {idx} - Bottom Half (with sockets) ---")
-            bottom = make_solid_hemisphere(False)
-            add_keys(bottom, specs, False)
-
-            log_message(f"\n--- Exporting Bead {idx} Halves ---")
-            export_stl(top, base_output_dir, f"bead_{idx}_top.stl")
-            export_stl(bottom, base_output_dir, f"bead_{idx}_bottom.stl")
-
-            log_message(f"\nBead {idx} layout:")
-            for s, (x, y) in specs:
-                log_message(f"  {s:8s}  (x={x:.1f}, y={y:.1f}) mm")
-            log_message("-" * 40)
+        with undo_disabled():
+            wipe_scene()
+
+            try:
+                if can_run_workers():
+                    generate_beads_parallel(base_output_dir)
+                else:
+                    # Every bead starts from the same noisy hemispheres, so they are
+                    # built on first use and copied per bead
+                    for idx in range(1, BEAD_COUNT + 1):
+                        make_one_bead(idx, SEED + idx, base_output_dir)
+            finally:
+                # Release the shared meshes and tool objects even if a bead fails
+                free_base_meshes()
+                free_tool_objects()
 
         log_message("\n--- Protein-bead generator script finished ---")
 
     except Exception as e:
         # Catch any unexpected errors during script execution and log them
-        log_message(f"\n--- Script encountered a critical error: {e} ---")
-        log_message("Traceback:")
-        log_message(traceback.format_exc())
+        # logger.exception appends the traceback and, being ERROR level,
+        # flushes the buffered log straight to disk
+        logger.exception(f"\n--- Script encountered a critical error: {e} ---")
 
     finally:
-        # Ensure the log file is closed
-        if log_file and not log_file.closed:
-            log_file.close()
+        # Flush the buffer and close the log file, then go back to console logging
+        setup_log()
+        if log_filepath:
             print(f"Script finished. Debugging log saved to: {log_filepath}")
-        elif not log_file:
-            print("Script finished. Debugging messages were printed to console (log file creation failed).")
         else:
-            print("Script finished. Log file was already closed.")
+            print("Script finished. Debugging messages were printed to console (log file creation failed).")
 
 
 # Ensure we are in OBJECT mode before starting the script execution
@@ -382,4 +835,7 @@ if bpy.context.object and bpy.context.object.mode != 'OBJECT':
 
 # Run the main function when the script is executed
 if __name__ == "__main__":
-    generate_beads()
+    if "--" in sys.argv and "--bead" in sys.argv:
+        run_worker()
+    else:
+        generate_beads()
@@ -0,0 +1,75 @@
+"""
+Numba kernels for the protein-bead generator
+=====================================================================
+Classic lattice-gradient Perlin noise, JIT-compiled and cached so that
+reruns of the Blender script skip the compile step.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+
+def make_perm(seed):
+    """Return the doubled (512-entry) permutation table for the given seed."""
+    perm = np.random.default_rng(seed).permutation(256).astype(np.int32)
+    return np.concatenate((perm, perm))
+
+
+@njit(cache=True, fastmath=True)
+def _fade(t):
+    return t * t * (3.0 - 2.0 * t)
+
+
+@njit(cache=True, fastmath=True)
+def _lerp(t, a, b):
+    return a + t * (b - a)
+
+
+@njit(cache=True, fastmath=True)
+def _grad(h, x, y, z):
+    # Pick one of the 12 cube-edge gradients and dot it with (x, y, z)
+    h &= 15
+    u = x if h < 8 else y
+    if h < 4:
+        v = y
+    elif h == 12 or h == 14:
+        v = x
+    else:
+        v = z
+    return (u if (h & 1) == 0 else -u) + (v if (h & 2) == 0 else -v)
+
+
+@njit(cache=True, parallel=True, fastmath=True)
+def perlin3d(pts, perm):
+    """Evaluate 3D Perlin noise for an (N, 3) float32 array of sample points."""
+    out = np.empty(pts.shape[0], dtype=np.float32)
+    for i in prange(pts.shape[0]):
+        x, y, z = pts[i, 0], pts[i, 1], pts[i, 2]
+        fx, fy, fz = np.floor(x), np.floor(y), np.floor(z)
+        xi = np.int32(fx) & 255
+        yi = np.int32(fy) & 255
+        zi = np.int32(fz) & 255
+        xf, yf, zf = x - fx, y - fy, z - fz
+        u, v, w = _fade(xf), _fade(yf), _fade(zf)
+
+        # Hash the eight lattice corners surrounding the point
+        a = perm[xi] + yi
+        aa = perm[a] + zi
+        ab = perm[a + 1] + zi
+        b = perm[xi + 1] + yi
+        ba = perm[b] + zi
+        bb = perm[b + 1] + zi
+
+        # Trilinear blend of the corner gradient contributions
+        out[i] = _lerp(w,
+                       _lerp(v,
+                             _lerp(u, _grad(perm[aa], xf, yf, zf),
+                                   _grad(perm[ba], xf - 1, yf, zf)),
+                             _lerp(u, _grad(perm[ab], xf, yf - 1, zf),
+                                   _grad(perm[bb], xf - 1, yf - 1, zf))),
+                       _lerp(v,
+                             _lerp(u, _grad(perm[aa + 1], xf, yf, zf - 1),
+                                   _grad(perm[ba + 1], xf - 1, yf, zf - 1)),
+                             _lerp(u, _grad(perm[ab + 1], xf, yf - 1, zf - 1),
+                                   _grad(perm[bb + 1], xf - 1, yf - 1, zf - 1))))
+    return out